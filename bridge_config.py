@@ -1,11 +1,24 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import json
+import logging
+import os
+from collections.abc import Sequence
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
 
+SAVE_DEBOUNCE_SECONDS = 0.2
+
+
+@lru_cache(maxsize=256)
 def normalize_bridge_name(name: str | None) -> str:
     if not name:
         return "default"
@@ -15,67 +28,166 @@ def normalize_bridge_name(name: str | None) -> str:
     return name[:64]
 
 
+def _dumps(data: dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8")
+
+
+def _sort_ids(bridges: dict[str, Any]) -> None:
+    # Mutators rely on id lists being sorted and unique so they can bisect.
+    for name, cfg in bridges.items():
+        if not isinstance(cfg, dict):
+            continue
+        for key in ("discord_channels", "telegram_chats"):
+            ids = cfg.get(key)
+            if not isinstance(ids, list):
+                continue
+            valid: set[int] = set()
+            for x in ids:
+                try:
+                    valid.add(int(x))
+                except (TypeError, ValueError):
+                    logging.warning("Ignoring invalid %s entry %r in bridge %r", key, x, name)
+            cfg[key] = sorted(valid)
+
+
 class BridgeConfig:
     def __init__(self, path: str | Path) -> None:
         self.path = Path(path)
+        # Only serializes writes to disk; readers and mutators never take it.
         self._lock = asyncio.Lock()
         self._data: dict[str, Any] = {"bridges": {}}
+        self._dirty = False
+        self._flush_task: asyncio.Task | None = None
+        self._dc_index: dict[int, list[str]] = {}
+        self._tg_index: dict[int, list[str]] = {}
+        self._dc_sets: dict[str, frozenset[int]] = {}
+        self._tg_sets: dict[str, frozenset[int]] = {}
+        self._list_bridges_cache: dict[str, dict[str, list[int]]] | None = None
+        self._dc_channels_cache: dict[str, tuple[int, ...]] = {}
+        self._tg_chats_cache: dict[str, tuple[int, ...]] = {}
 
     async def load(self) -> None:
         if not self.path.exists():
             return
         try:
-            raw = await asyncio.to_thread(self.path.read_text, encoding="utf-8")
-            data = json.loads(raw)
+            raw = await asyncio.to_thread(self.path.read_bytes)
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         except Exception:
             return
         if isinstance(data, dict) and isinstance(data.get("bridges"), dict):
+            _sort_ids(data["bridges"])
             self._data = data
+            self._invalidate()
 
     async def save(self) -> None:
+        async with self._lock:
+            self._dirty = False
+            try:
+                # self._data is never mutated in place, so it can be serialized off-loop.
+                await asyncio.to_thread(self._write, self._data)
+            except BaseException:
+                # Keep the edit pending so a later flush retries it.
+                self._dirty = True
+                raise
+
+    async def flush(self) -> None:
+        # A debounced save may be mid-write with _dirty already cleared; wait for
+        # it (it logs its own errors) so a failed write is retried below.
+        task = self._flush_task
+        if task is not None and not task.done():
+            await task
+        if self._dirty:
+            await self.save()
+
+    def _write(self, data: dict[str, Any]) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        raw = json.dumps(self._data, ensure_ascii=False, indent=2, sort_keys=True)
-        await asyncio.to_thread(self.path.write_text, raw + "\n", encoding="utf-8")
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(_dumps(data) + b"\n")
+        os.replace(tmp, self.path)
 
-    def bridges_for_discord_channel(self, channel_id: int) -> list[str]:
+    def _schedule_save(self) -> None:
+        # Coalesce bursts of edits into a single write.
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+        try:
+            # Edits made while a write is in flight re-mark the config dirty but
+            # see this task still running, so keep saving until it settles.
+            while self._dirty:
+                await self.save()
+        except Exception:
+            logging.exception("Failed to save bridge config to %s", self.path)
+
+    def _invalidate(self) -> None:
+        self._list_bridges_cache = None
+        self._dc_channels_cache = {}
+        self._tg_chats_cache = {}
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self) -> None:
+        dc_index: dict[int, list[str]] = {}
+        tg_index: dict[int, list[str]] = {}
+        dc_sets: dict[str, frozenset[int]] = {}
+        tg_sets: dict[str, frozenset[int]] = {}
         bridges: dict[str, Any] = self._data.get("bridges", {})
-        out: list[str] = []
         for name, cfg in bridges.items():
             if not isinstance(cfg, dict):
                 continue
+            name = str(name)
             channels = cfg.get("discord_channels", [])
-            if isinstance(channels, list) and channel_id in channels:
-                out.append(str(name))
-        return out
+            if isinstance(channels, list):
+                dc_sets[name] = frozenset(int(x) for x in channels)
+                for channel_id in dc_sets[name]:
+                    dc_index.setdefault(channel_id, []).append(name)
+            chats = cfg.get("telegram_chats", [])
+            if isinstance(chats, list):
+                tg_sets[name] = frozenset(int(x) for x in chats)
+                for chat_id in tg_sets[name]:
+                    tg_index.setdefault(chat_id, []).append(name)
+        self._dc_index = dc_index
+        self._tg_index = tg_index
+        self._dc_sets = dc_sets
+        self._tg_sets = tg_sets
+
+    def bridges_for_discord_channel(self, channel_id: int) -> list[str]:
+        return self._dc_index.get(channel_id, [])
 
     def bridges_for_telegram_chat(self, chat_id: int) -> list[str]:
-        bridges: dict[str, Any] = self._data.get("bridges", {})
-        out: list[str] = []
-        for name, cfg in bridges.items():
-            if not isinstance(cfg, dict):
-                continue
-            chats = cfg.get("telegram_chats", [])
-            if isinstance(chats, list) and chat_id in chats:
-                out.append(str(name))
-        return out
+        return self._tg_index.get(chat_id, [])
 
-    def discord_channels(self, bridge_name: str) -> list[int]:
-        bridges: dict[str, Any] = self._data.get("bridges", {})
-        cfg = bridges.get(bridge_name)
-        if not isinstance(cfg, dict):
-            return []
-        channels = cfg.get("discord_channels", [])
-        return [int(x) for x in channels] if isinstance(channels, list) else []
+    def discord_channels(self, bridge_name: str) -> Sequence[int]:
+        cached = self._dc_channels_cache.get(bridge_name)
+        if cached is None:
+            cached = self._ids(bridge_name, "discord_channels")
+            self._dc_channels_cache[bridge_name] = cached
+        return cached
+
+    def telegram_chats(self, bridge_name: str) -> Sequence[int]:
+        cached = self._tg_chats_cache.get(bridge_name)
+        if cached is None:
+            cached = self._ids(bridge_name, "telegram_chats")
+            self._tg_chats_cache[bridge_name] = cached
+        return cached
 
-    def telegram_chats(self, bridge_name: str) -> list[int]:
+    def _ids(self, bridge_name: str, key: str) -> tuple[int, ...]:
         bridges: dict[str, Any] = self._data.get("bridges", {})
         cfg = bridges.get(bridge_name)
         if not isinstance(cfg, dict):
-            return []
-        chats = cfg.get("telegram_chats", [])
-        return [int(x) for x in chats] if isinstance(chats, list) else []
+            return ()
+        ids = cfg.get(key, [])
+        return tuple(int(x) for x in ids) if isinstance(ids, list) else ()
 
     def list_bridges(self) -> dict[str, dict[str, list[int]]]:
+        if self._list_bridges_cache is None:
+            self._list_bridges_cache = self._build_list_bridges()
+        return self._list_bridges_cache
+
+    def _build_list_bridges(self) -> dict[str, dict[str, list[int]]]:
         bridges: dict[str, Any] = self._data.get("bridges", {})
         out: dict[str, dict[str, list[int]]] = {}
         for name, cfg in bridges.items():
@@ -91,76 +203,79 @@ class BridgeConfig:
             }
         return out
 
+    def _bridge(self, bridge_name: str) -> dict[str, Any] | None:
+        cfg = self._data.get("bridges", {}).get(bridge_name)
+        return cfg if isinstance(cfg, dict) else None
+
+    def _replace_bridge(self, bridge_name: str, cfg: dict[str, Any] | None) -> None:
+        # Copy-on-write: build a new mapping and swap it in, so readers never
+        # see a half-applied edit and need no lock.
+        old = self._data
+        bridges = dict(old.get("bridges", {}))
+        if cfg is None:
+            bridges.pop(bridge_name, None)
+        else:
+            bridges[bridge_name] = cfg
+        self._data = {**old, "bridges": bridges}
+        self._invalidate()
+        self._schedule_save()
+
     async def add_discord_channel(self, bridge_name: str, channel_id: int) -> bool:
         bridge_name = normalize_bridge_name(bridge_name)
-        async with self._lock:
-            bridges: dict[str, Any] = self._data.setdefault("bridges", {})
-            cfg = bridges.setdefault(
-                bridge_name, {"discord_channels": [], "telegram_chats": []}
-            )
-            if not isinstance(cfg, dict):
-                bridges[bridge_name] = {"discord_channels": [], "telegram_chats": []}
-                cfg = bridges[bridge_name]
-
-            channels = cfg.get("discord_channels")
-            if not isinstance(channels, list):
-                channels = []
-            if channel_id in channels:
-                return False
-            channels.append(channel_id)
-            cfg["discord_channels"] = sorted(set(int(x) for x in channels))
-            await self.save()
-            return True
+        cfg = self._bridge(bridge_name) or {"discord_channels": [], "telegram_chats": []}
+        channels = cfg.get("discord_channels")
+        if not isinstance(channels, list):
+            channels = []
+        if channel_id in self._dc_sets.get(bridge_name, frozenset()):
+            return False
+        channels = list(channels)
+        bisect.insort(channels, int(channel_id))
+        self._replace_bridge(bridge_name, {**cfg, "discord_channels": channels})
+        return True
 
     async def add_telegram_chat(self, bridge_name: str, chat_id: int) -> bool:
         bridge_name = normalize_bridge_name(bridge_name)
-        async with self._lock:
-            bridges: dict[str, Any] = self._data.setdefault("bridges", {})
-            cfg = bridges.setdefault(
-                bridge_name, {"discord_channels": [], "telegram_chats": []}
-            )
-            if not isinstance(cfg, dict):
-                bridges[bridge_name] = {"discord_channels": [], "telegram_chats": []}
-                cfg = bridges[bridge_name]
-
-            chats = cfg.get("telegram_chats")
-            if not isinstance(chats, list):
-                chats = []
-            if chat_id in chats:
-                return False
-            chats.append(chat_id)
-            cfg["telegram_chats"] = sorted(set(int(x) for x in chats))
-            await self.save()
-            return True
+        cfg = self._bridge(bridge_name) or {"discord_channels": [], "telegram_chats": []}
+        chats = cfg.get("telegram_chats")
+        if not isinstance(chats, list):
+            chats = []
+        if chat_id in self._tg_sets.get(bridge_name, frozenset()):
+            return False
+        chats = list(chats)
+        bisect.insort(chats, int(chat_id))
+        self._replace_bridge(bridge_name, {**cfg, "telegram_chats": chats})
+        return True
 
     async def remove_discord_channel(self, bridge_name: str, channel_id: int) -> bool:
         bridge_name = normalize_bridge_name(bridge_name)
-        async with self._lock:
-            bridges: dict[str, Any] = self._data.get("bridges", {})
-            cfg = bridges.get(bridge_name)
-            if not isinstance(cfg, dict):
-                return False
-            channels = cfg.get("discord_channels")
-            if not isinstance(channels, list) or channel_id not in channels:
-                return False
-            cfg["discord_channels"] = sorted(int(x) for x in channels if int(x) != int(channel_id))
-            if not cfg.get("discord_channels") and not cfg.get("telegram_chats"):
-                bridges.pop(bridge_name, None)
-            await self.save()
-            return True
+        cfg = self._bridge(bridge_name)
+        if cfg is None:
+            return False
+        if channel_id not in self._dc_sets.get(bridge_name, frozenset()):
+            return False
+        channels = list(cfg["discord_channels"])
+        idx = bisect.bisect_left(channels, int(channel_id))
+        if idx < len(channels) and channels[idx] == channel_id:
+            del channels[idx]
+        cfg = {**cfg, "discord_channels": channels}
+        if not cfg.get("discord_channels") and not cfg.get("telegram_chats"):
+            cfg = None
+        self._replace_bridge(bridge_name, cfg)
+        return True
 
     async def remove_telegram_chat(self, bridge_name: str, chat_id: int) -> bool:
         bridge_name = normalize_bridge_name(bridge_name)
-        async with self._lock:
-            bridges: dict[str, Any] = self._data.get("bridges", {})
-            cfg = bridges.get(bridge_name)
-            if not isinstance(cfg, dict):
-                return False
-            chats = cfg.get("telegram_chats")
-            if not isinstance(chats, list) or chat_id not in chats:
-                return False
-            cfg["telegram_chats"] = sorted(int(x) for x in chats if int(x) != int(chat_id))
-            if not cfg.get("discord_channels") and not cfg.get("telegram_chats"):
-                bridges.pop(bridge_name, None)
-            await self.save()
-            return True
+        cfg = self._bridge(bridge_name)
+        if cfg is None:
+            return False
+        if chat_id not in self._tg_sets.get(bridge_name, frozenset()):
+            return False
+        chats = list(cfg["telegram_chats"])
+        idx = bisect.bisect_left(chats, int(chat_id))
+        if idx < len(chats) and chats[idx] == chat_id:
+            del chats[idx]
+        cfg = {**cfg, "telegram_chats": chats}
+        if not cfg.get("discord_channels") and not cfg.get("telegram_chats"):
+            cfg = None
+        self._replace_bridge(bridge_name, cfg)
+        return True
@@ -4,6 +4,8 @@ import asyncio
 import logging
 import os
 import sys
+from collections import OrderedDict
+from collections.abc import Sequence
 from pathlib import Path
 
 import discord
@@ -25,24 +27,31 @@ from message_store import MessageStore
 
 TELEGRAM_MESSAGE_LIMIT = 4096
 DISCORD_MESSAGE_LIMIT = 2000
+# Checked in order for Telegram messages without text or caption.
+TELEGRAM_MEDIA_KINDS = ("photo", "document", "sticker", "voice", "video")
+# Upper bound on channels fetched over HTTP and kept by the bridge's channel cache.
+FETCHED_CHANNEL_LIMIT = 256
 
 
 def load_dotenv(path: str | Path = ".env") -> None:
     p = Path(path)
     if not p.exists():
         return
-    for raw_line in p.read_text(encoding="utf-8").splitlines():
-        line = raw_line.strip()
-        if not line or line.startswith("#"):
-            continue
-        key, sep, value = line.partition("=")
-        if sep != "=":
-            continue
-        key = key.strip()
-        if not key or key in os.environ:
-            continue
-        value = value.strip().strip('"').strip("'")
-        os.environ[key] = value
+    with p.open("r", encoding="utf-8") as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, sep, value = line.partition("=")
+            if sep != "=":
+                continue
+            key = key.strip()
+            if not key or key in os.environ:
+                continue
+            value = value.strip()
+            if value and (value[0] in "\"'" or value[-1] in "\"'"):
+                value = value.strip('"').strip("'")
+            os.environ[key] = value
 
 
 def acquire_single_instance_lock(lock_path: str | Path):
@@ -111,20 +120,32 @@ def split_text(text: str, limit: int) -> list[str]:
     if len(text) <= limit:
         return [text]
 
+    # Walk the text by index so each chunk is sliced once, instead of
+    # re-slicing the remaining tail on every iteration.
     out: list[str] = []
-    remaining = text
-    while len(remaining) > limit:
-        cut = remaining.rfind("\n", 0, limit)
-        if cut < max(1, limit // 2):
-            cut = limit
-        out.append(remaining[:cut].rstrip())
-        remaining = remaining[cut:].lstrip()
-    if remaining:
-        out.append(remaining)
+    i = 0
+    n = len(text)
+    min_cut = max(1, limit // 2)
+    while n - i > limit:
+        cut = text.rfind("\n", i, i + limit)
+        if cut < i + min_cut:
+            cut = i + limit
+        out.append(text[i:cut].rstrip())
+        i = cut
+        while i < n and text[i].isspace():
+            i += 1
+    if i < n:
+        out.append(text[i:])
     return out
 
 
-def format_discord_message(message: discord.Message) -> str | None:
+def discord_message_prefix(message: discord.Message) -> str:
+    guild = message.guild.name if message.guild else "DM"
+    channel_name = getattr(message.channel, "name", str(message.channel.id))
+    return f"[Discord {guild}#{channel_name}] "
+
+
+def format_discord_message(message: discord.Message, prefix: str) -> str | None:
     parts: list[str] = []
     content = (message.content or "").strip()
     if content:
@@ -136,34 +157,19 @@ def format_discord_message(message: discord.Message) -> str | None:
     if not body:
         return None
 
-    guild = message.guild.name if message.guild else "DM"
-    channel_name = getattr(message.channel, "name", str(message.channel.id))
     author = message.author.display_name
-    return f"[Discord {guild}#{channel_name}] {author}:\n{body}"
+    return f"{prefix}{author}:\n{body}"
 
 
 def format_telegram_message(message) -> str | None:
-    parts: list[str] = []
-    if getattr(message, "text", None):
-        parts.append(message.text)
-    elif getattr(message, "caption", None):
-        parts.append(message.caption)
-    else:
-        kind = None
-        if getattr(message, "photo", None):
-            kind = "photo"
-        elif getattr(message, "document", None):
-            kind = "document"
-        elif getattr(message, "sticker", None):
-            kind = "sticker"
-        elif getattr(message, "voice", None):
-            kind = "voice"
-        elif getattr(message, "video", None):
-            kind = "video"
-        if kind:
-            parts.append(f"[{kind}]")
-
-    body = "\n".join(p for p in parts if p).strip()
+    body = getattr(message, "text", None) or getattr(message, "caption", None)
+    if not body:
+        for kind in TELEGRAM_MEDIA_KINDS:
+            if getattr(message, kind, None):
+                body = f"[{kind}]"
+                break
+
+    body = (body or "").strip()
     if not body:
         return None
 
@@ -196,7 +202,8 @@ class BridgeDiscordClient(discord.Client):
         self._store = store
         self._telegram_app = telegram_app
         self._guild_id = guild_id
-        self._channel_cache: dict[int, discord.abc.Messageable] = {}
+        self._channel_cache: OrderedDict[int, discord.abc.Messageable] = OrderedDict()
+        self._prefix_cache: dict[tuple[int, int], str] = {}
 
     async def setup_hook(self) -> None:
         self._register_commands()
@@ -261,25 +268,65 @@ class BridgeDiscordClient(discord.Client):
             if not data:
                 await interaction.response.send_message("No bridges configured.", ephemeral=True)
                 return
-            lines: list[str] = []
-            for name, cfg in sorted(data.items()):
-                lines.append(
-                    f"- {name}: dc={len(cfg['discord_channels'])}, tg={len(cfg['telegram_chats'])}"
-                )
-            await interaction.response.send_message("\n".join(lines), ephemeral=True)
+            text = "\n".join(
+                f"- {name}: dc={len(cfg['discord_channels'])}, tg={len(cfg['telegram_chats'])}"
+                for name, cfg in sorted(data.items())
+            )
+            await interaction.response.send_message(text, ephemeral=True)
 
     async def on_ready(self) -> None:
         logging.info("Discord connected as %s (id=%s)", self.user, getattr(self.user, "id", None))
 
+    async def on_guild_channel_delete(self, channel) -> None:
+        self._channel_cache.pop(channel.id, None)
+        self._prefix_cache.pop((channel.guild.id, channel.id), None)
+
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent) -> None:
+        self._channel_cache.pop(payload.thread_id, None)
+        self._prefix_cache.pop((payload.guild_id, payload.thread_id), None)
+
+    async def on_guild_channel_update(self, before, after) -> None:
+        self._prefix_cache.pop((after.guild.id, after.id), None)
+
+    async def on_thread_update(self, before: discord.Thread, after: discord.Thread) -> None:
+        self._prefix_cache.pop((after.guild.id, after.id), None)
+
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild) -> None:
+        self._forget_guild_prefixes(after.id)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        for channel_id, channel in list(self._channel_cache.items()):
+            if getattr(getattr(channel, "guild", None), "id", None) == guild.id:
+                self._channel_cache.pop(channel_id, None)
+        self._forget_guild_prefixes(guild.id)
+
+    def _forget_guild_prefixes(self, guild_id: int) -> None:
+        for key in [k for k in self._prefix_cache if k[0] == guild_id]:
+            del self._prefix_cache[key]
+
+    def _message_prefix(self, message: discord.Message) -> str:
+        key = (message.guild.id if message.guild else 0, message.channel.id)
+        prefix = self._prefix_cache.get(key)
+        if prefix is None:
+            prefix = discord_message_prefix(message)
+            self._prefix_cache[key] = prefix
+        return prefix
+
     async def _get_channel(self, channel_id: int):
-        cached = self.get_channel(channel_id)
+        # discord.py's live cache stays current across reconnects, so it wins;
+        # only channels it doesn't track are fetched and kept here.
+        live = self.get_channel(channel_id)
+        if live is not None:
+            return live
+        cached = self._channel_cache.get(channel_id)
         if cached is not None:
+            self._channel_cache.move_to_end(channel_id)
             return cached
-        if channel_id in self._channel_cache:
-            return self._channel_cache[channel_id]
-        fetched = await self.fetch_channel(channel_id)
-        self._channel_cache[channel_id] = fetched
-        return fetched
+        channel = await self.fetch_channel(channel_id)
+        self._channel_cache[channel_id] = channel
+        while len(self._channel_cache) > FETCHED_CHANNEL_LIMIT:
+            self._channel_cache.popitem(last=False)
+        return channel
 
     async def on_message(self, message: discord.Message) -> None:
         if message.author.bot or message.webhook_id is not None:
@@ -293,7 +340,7 @@ class BridgeDiscordClient(discord.Client):
         if not bridges:
             return
 
-        text = format_discord_message(message)
+        text = format_discord_message(message, self._message_prefix(message))
         if not text:
             return
 
@@ -319,10 +366,13 @@ class BridgeDiscordClient(discord.Client):
         bridge: str,
         message: discord.Message,
         text: str,
-        tg_chat_ids: list[int],
+        tg_chat_ids: Sequence[int],
         parent_discord_id: int | None,
     ) -> None:
         bot = self._telegram_app.bot
+        chunks = split_text(text, TELEGRAM_MESSAGE_LIMIT)
+        if not chunks:
+            return
 
         async def send_one(chat_id: int):
             reply_to = None
@@ -333,27 +383,15 @@ class BridgeDiscordClient(discord.Client):
                     telegram_chat_id=chat_id,
                 )
 
-            chunks = split_text(text, TELEGRAM_MESSAGE_LIMIT)
-            if not chunks:
-                return
-
-            sent_messages = []
-            sent_first = await bot.send_message(
-                chat_id=chat_id,
-                text=chunks[0],
-                reply_to_message_id=reply_to,
-                disable_web_page_preview=True,
-            )
-            sent_messages.append(sent_first)
-            for chunk in chunks[1:]:
+            # Chunks are sent one by one to keep their order; each mapping is
+            # saved right away so replies to early chunks resolve immediately.
+            for index, chunk in enumerate(chunks):
                 sent = await bot.send_message(
                     chat_id=chat_id,
                     text=chunk,
+                    reply_to_message_id=reply_to if index == 0 else None,
                     disable_web_page_preview=True,
                 )
-                sent_messages.append(sent)
-
-            for sent in sent_messages:
                 await self._store.save_map(
                     bridge=bridge,
                     discord_channel_id=message.channel.id,
@@ -390,10 +428,14 @@ class BridgeDiscordClient(discord.Client):
         *,
         bridge: str,
         telegram_message,
-        discord_channel_ids: list[int],
+        discord_channel_ids: Sequence[int],
         text: str,
         parent_telegram_id: int | None,
     ) -> None:
+        chunks = split_text(text, DISCORD_MESSAGE_LIMIT)
+        if not chunks:
+            return
+
         async def send_one(channel_id: int):
             channel = await self._get_channel(channel_id)
             if not hasattr(channel, "send"):
@@ -418,25 +460,12 @@ class BridgeDiscordClient(discord.Client):
                     except Exception:
                         reference = None
 
-            chunks = split_text(text, DISCORD_MESSAGE_LIMIT)
-            if not chunks:
-                return
-
-            sent_messages = []
-            sent_first = await channel.send(
-                chunks[0],
-                reference=reference,
-                allowed_mentions=discord.AllowedMentions.none(),
-            )
-            sent_messages.append(sent_first)
-            for chunk in chunks[1:]:
+            for index, chunk in enumerate(chunks):
                 sent = await channel.send(
                     chunk,
+                    reference=reference if index == 0 else None,
                     allowed_mentions=discord.AllowedMentions.none(),
                 )
-                sent_messages.append(sent)
-
-            for sent in sent_messages:
                 await self._store.save_map(
                     bridge=bridge,
                     discord_channel_id=channel_id,
@@ -499,12 +528,11 @@ async def build_telegram_app(
                 chat_id=update.effective_chat.id, text="No bridges configured."
             )
             return
-        lines: list[str] = []
-        for name, cfg in sorted(data.items()):
-            lines.append(
-                f"- {name}: dc={len(cfg['discord_channels'])}, tg={len(cfg['telegram_chats'])}"
-            )
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
+        text = "\n".join(
+            f"- {name}: dc={len(cfg['discord_channels'])}, tg={len(cfg['telegram_chats'])}"
+            for name, cfg in sorted(data.items())
+        )
+        await context.bot.send_message(chat_id=update.effective_chat.id, text=text)
 
     async def on_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         discord_client: BridgeDiscordClient | None = context.application.bot_data.get(
@@ -569,21 +597,22 @@ async def run() -> None:
     guild_id_raw = os.environ.get("DISCORD_GUILD_ID", "").strip()
     guild_id = int(guild_id_raw) if guild_id_raw else None
 
-    config = BridgeConfig(config_path)
-    await config.load()
-
     try:
         lock_handle = acquire_single_instance_lock(lock_path)
     except RuntimeError:
         logging.error("Bridge is already running. Exiting.")
         return
 
+    config = BridgeConfig(config_path)
     store = MessageStore(db_path)
-    await store.open()
-
-    telegram_app = await build_telegram_app(
-        token=telegram_token,
-        config=config,
+    # These are independent, so overlap their disk I/O.
+    _, _, telegram_app = await asyncio.gather(
+        config.load(),
+        store.open(),
+        build_telegram_app(
+            token=telegram_token,
+            config=config,
+        ),
     )
     discord_client = BridgeDiscordClient(
         config=config,
@@ -607,6 +636,10 @@ async def run() -> None:
                 logging.exception("Error while closing Discord client")
             await telegram_app.updater.stop()
             await telegram_app.stop()
+            try:
+                await config.flush()
+            except Exception:
+                logging.exception("Error while saving bridge config")
             await store.close()
             try:
                 lock_handle.close()
@@ -1,60 +1,223 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 
+COMMIT_INTERVAL_SECONDS = 0.1
+# After a failed insert, wait this long (doubling up to the max) before retrying.
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+# Oldest queued rows are dropped beyond this while inserts keep failing.
+MAX_PENDING_ROWS = 10_000
+LOOKUP_CACHE_SIZE = 10_000
+
+_CREATE_MAP_SQL = """
+CREATE TABLE IF NOT EXISTS message_map (
+  bridge TEXT NOT NULL,
+  discord_channel_id INTEGER NOT NULL,
+  discord_message_id INTEGER NOT NULL,
+  telegram_chat_id INTEGER NOT NULL,
+  telegram_message_id INTEGER NOT NULL,
+  created_at INTEGER NOT NULL,
+  PRIMARY KEY (
+    discord_channel_id,
+    discord_message_id,
+    telegram_chat_id,
+    telegram_message_id
+  )
+) WITHOUT ROWID
+"""
+
+_INSERT_MAP_SQL = """
+INSERT INTO message_map(
+  bridge,
+  discord_channel_id,
+  discord_message_id,
+  telegram_chat_id,
+  telegram_message_id,
+  created_at
+)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+
+
+def _cache_get(
+    cache: OrderedDict[tuple[int, int, int], int], key: tuple[int, int, int]
+) -> int | None:
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(
+    cache: OrderedDict[tuple[int, int, int], int], key: tuple[int, int, int], value: int
+) -> None:
+    # Lookups return the smallest mapped id, so keep the minimum on collisions.
+    current = cache.get(key)
+    if current is not None and current <= value:
+        cache.move_to_end(key)
+        return
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > LOOKUP_CACHE_SIZE:
+        cache.popitem(last=False)
+
 
 class MessageStore:
     def __init__(self, path: str | Path) -> None:
         self.path = Path(path)
-        self._lock = asyncio.Lock()
+        # The connection is used from worker threads, so guard it with a thread lock.
+        self._lock = threading.Lock()
         self._conn: sqlite3.Connection | None = None
+        self._dirty = False
+        self._pending: list[tuple[str, int, int, int, int, int]] = []
+        self._pending_lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._commit_task: asyncio.Task | None = None
+        # Recently mapped ids, so replies to fresh messages skip SQLite.
+        self._fwd_cache: OrderedDict[tuple[int, int, int], int] = OrderedDict()
+        self._rev_cache: OrderedDict[tuple[int, int, int], int] = OrderedDict()
 
     async def open(self) -> None:
+        await asyncio.to_thread(self._open_sync)
+        self._commit_task = asyncio.create_task(self._commit_loop())
+
+    def _open_sync(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(self.path, check_same_thread=False)
-        self._conn.execute("PRAGMA journal_mode=WAL;")
-        self._conn.execute("PRAGMA synchronous=NORMAL;")
-        self._conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS message_map (
-              bridge TEXT NOT NULL,
-              discord_channel_id INTEGER NOT NULL,
-              discord_message_id INTEGER NOT NULL,
-              telegram_chat_id INTEGER NOT NULL,
-              telegram_message_id INTEGER NOT NULL,
-              created_at INTEGER NOT NULL,
-              PRIMARY KEY (
-                discord_channel_id,
-                discord_message_id,
-                telegram_chat_id,
-                telegram_message_id
-              )
-            )
-            """
-        )
-        self._conn.execute(
-            """
-            CREATE INDEX IF NOT EXISTS idx_discord_to_tg
-            ON message_map(discord_channel_id, discord_message_id, telegram_chat_id)
-            """
-        )
-        self._conn.execute(
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        self._migrate_without_rowid(conn)
+        conn.execute(_CREATE_MAP_SQL)
+        # The clustered primary key already covers Discord -> Telegram lookups.
+        conn.execute("DROP INDEX IF EXISTS idx_discord_to_tg")
+        conn.execute(
             """
             CREATE INDEX IF NOT EXISTS idx_tg_to_discord
             ON message_map(telegram_chat_id, telegram_message_id, discord_channel_id)
             """
         )
-        self._conn.commit()
+        conn.commit()
+        with self._lock:
+            self._conn = conn
+
+    @staticmethod
+    def _migrate_without_rowid(conn: sqlite3.Connection) -> None:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'message_map'"
+        ).fetchone()
+        if row is None or "WITHOUT ROWID" in row[0].upper():
+            return
+        conn.executescript(
+            f"""
+            BEGIN;
+            ALTER TABLE message_map RENAME TO message_map_old;
+            {_CREATE_MAP_SQL};
+            INSERT INTO message_map(
+              bridge,
+              discord_channel_id,
+              discord_message_id,
+              telegram_chat_id,
+              telegram_message_id,
+              created_at
+            )
+            SELECT
+              bridge,
+              discord_channel_id,
+              discord_message_id,
+              telegram_chat_id,
+              telegram_message_id,
+              created_at
+            FROM message_map_old;
+            DROP TABLE message_map_old;
+            COMMIT;
+            """
+        )
 
     async def close(self) -> None:
-        async with self._lock:
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+            try:
+                await self._commit_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logging.exception("Message map commit loop failed")
+            self._commit_task = None
+        await asyncio.to_thread(self._close_sync)
+
+    def _close_sync(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._flush_pending_locked(force=True)
+                self._conn.commit()
+                self._dirty = False
+            finally:
+                self._conn.close()
+                self._conn = None
+
+    async def _commit_loop(self) -> None:
+        # Group commits so many inserts share a single sync instead of one each.
+        while True:
+            await asyncio.sleep(COMMIT_INTERVAL_SECONDS)
+            if self._pending or self._dirty:
+                try:
+                    await asyncio.to_thread(self._commit_sync)
+                except Exception:
+                    logging.exception("Failed to commit message map to %s", self.path)
+
+    def _commit_sync(self) -> None:
+        with self._lock:
             if self._conn is None:
                 return
-            self._conn.close()
-            self._conn = None
+            self._flush_pending_locked()
+            if self._dirty:
+                self._conn.commit()
+                self._dirty = False
+
+    def _flush_pending_locked(self, *, force: bool = False) -> None:
+        # Caller must hold self._lock.
+        if not force and time.monotonic() < self._retry_at:
+            return
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self._conn.executemany(_INSERT_MAP_SQL, batch)
+        except BaseException:
+            # Put the rows back so a later commit retries them, and back off.
+            self._failures += 1
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + delay
+            with self._pending_lock:
+                self._pending[:0] = batch
+                dropped = len(self._pending) - MAX_PENDING_ROWS
+                if dropped > 0:
+                    del self._pending[:dropped]
+            if dropped > 0:
+                logging.warning("Dropped %d unsaved message map rows", dropped)
+            raise
+        self._failures = 0
+        self._retry_at = 0.0
+        self._dirty = True
+
+    def _flush_pending_for_read_locked(self) -> None:
+        # Reads must keep working while writes fail; the rows stay queued.
+        try:
+            self._flush_pending_locked()
+        except Exception:
+            logging.exception("Failed to write pending message map rows to %s", self.path)
 
     async def save_map(
         self,
@@ -67,29 +230,19 @@ class MessageStore:
     ) -> None:
         if self._conn is None:
             raise RuntimeError("MessageStore is not open")
-        async with self._lock:
-            self._conn.execute(
-                """
-                INSERT OR IGNORE INTO message_map(
-                  bridge,
-                  discord_channel_id,
-                  discord_message_id,
-                  telegram_chat_id,
-                  telegram_message_id,
-                  created_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    bridge,
-                    int(discord_channel_id),
-                    int(discord_message_id),
-                    int(telegram_chat_id),
-                    int(telegram_message_id),
-                    int(time.time()),
-                ),
-            )
-            self._conn.commit()
+        row = (
+            bridge,
+            int(discord_channel_id),
+            int(discord_message_id),
+            int(telegram_chat_id),
+            int(telegram_message_id),
+            int(time.time()),
+        )
+        with self._pending_lock:
+            self._pending.append(row)
+        _, dc, dm, tc, tm, _ = row
+        _cache_put(self._fwd_cache, (dc, dm, tc), tm)
+        _cache_put(self._rev_cache, (tc, tm, dc), dm)
 
     async def find_telegram_message_id(
         self,
@@ -100,7 +253,25 @@ class MessageStore:
     ) -> int | None:
         if self._conn is None:
             raise RuntimeError("MessageStore is not open")
-        async with self._lock:
+        key = (int(discord_channel_id), int(discord_message_id), int(telegram_chat_id))
+        cached = _cache_get(self._fwd_cache, key)
+        if cached is not None:
+            return cached
+        found = await asyncio.to_thread(self._find_telegram_message_id_sync, *key)
+        if found is not None:
+            _cache_put(self._fwd_cache, key, found)
+        return found
+
+    def _find_telegram_message_id_sync(
+        self,
+        discord_channel_id: int,
+        discord_message_id: int,
+        telegram_chat_id: int,
+    ) -> int | None:
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError("MessageStore is not open")
+            self._flush_pending_for_read_locked()
             row = self._conn.execute(
                 """
                 SELECT MIN(telegram_message_id)
@@ -109,9 +280,9 @@ class MessageStore:
                   AND discord_message_id = ?
                   AND telegram_chat_id = ?
                 """,
-                (int(discord_channel_id), int(discord_message_id), int(telegram_chat_id)),
+                (discord_channel_id, discord_message_id, telegram_chat_id),
             ).fetchone()
-        return int(row[0]) if row else None
+        return int(row[0]) if row and row[0] is not None else None
 
     async def find_discord_message_id(
         self,
@@ -122,7 +293,25 @@ class MessageStore:
     ) -> int | None:
         if self._conn is None:
             raise RuntimeError("MessageStore is not open")
-        async with self._lock:
+        key = (int(telegram_chat_id), int(telegram_message_id), int(discord_channel_id))
+        cached = _cache_get(self._rev_cache, key)
+        if cached is not None:
+            return cached
+        found = await asyncio.to_thread(self._find_discord_message_id_sync, *key)
+        if found is not None:
+            _cache_put(self._rev_cache, key, found)
+        return found
+
+    def _find_discord_message_id_sync(
+        self,
+        telegram_chat_id: int,
+        telegram_message_id: int,
+        discord_channel_id: int,
+    ) -> int | None:
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError("MessageStore is not open")
+            self._flush_pending_for_read_locked()
             row = self._conn.execute(
                 """
                 SELECT MIN(discord_message_id)
@@ -131,6 +320,6 @@ class MessageStore:
                   AND telegram_message_id = ?
                   AND discord_channel_id = ?
                 """,
-                (int(telegram_chat_id), int(telegram_message_id), int(discord_channel_id)),
+                (telegram_chat_id, telegram_message_id, discord_channel_id),
             ).fetchone()
-        return int(row[0]) if row else None
+        return int(row[0]) if row and row[0] is not None else None